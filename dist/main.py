@@ -4,90 +4,388 @@ M3U8 Link Grabber
 Efficiently extracts M3U8 URLs from websites without loading heavy resources
 """
 
+from functools import lru_cache
 from urllib.parse import urljoin
+import argparse
 import requests
-import m3u8
+from requests.adapters import HTTPAdapter
 import time
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, WebDriverException
+import itertools
 import json
+import multiprocessing
+import orjson
+import os
+import re
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import websocket
 import sys
 import io
 
 
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+# Line buffered so pool workers' output is flushed before they exit
+sys.stdout = io.TextIOWrapper(
+    sys.stdout.buffer, encoding='utf-8', line_buffering=True)
+
+
+# Executables probed on PATH, then absolute install locations, when looking for Chrome
+CHROME_EXECUTABLES = [
+    'google-chrome',
+    'google-chrome-stable',
+    'chromium',
+    'chromium-browser',
+    'chrome',
+]
+CHROME_INSTALL_PATHS = [
+    '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
+    os.path.expandvars(r'%ProgramFiles%\Google\Chrome\Application\chrome.exe'),
+    os.path.expandvars(
+        r'%ProgramFiles(x86)%\Google\Chrome\Application\chrome.exe'),
+    os.path.expandvars(r'%LocalAppData%\Google\Chrome\Application\chrome.exe'),
+]
+
+
+# Profile kept between runs by a persistent (reusable) browser
+PERSISTENT_PROFILE_DIR = os.path.join(
+    tempfile.gettempdir(), 'm3u8grabber-profile')
+
+
+# URL patterns Chrome refuses to fetch, so the sockets for them are never opened
+BLOCKED_URL_PATTERNS = [
+    '*.png',
+    '*.jpg',
+    '*.jpeg',
+    '*.gif',
+    '*.webp',
+    '*.svg',
+    '*.woff*',
+    '*.ttf',
+    '*.css',
+    '*google-analytics*',
+    '*doubleclick*',
+]
+
+# Resource types failed at the request stage even when their URL has no telltale extension
+BLOCKED_RESOURCE_TYPES = ['Image', 'Font', 'Stylesheet']
+
+
+# Matches M3U8 URLs and HLS MIME types (application/vnd.apple.mpegurl, application/x-mpegURL)
+M3U8_PATTERN = re.compile(r'm3u8|mpegurl', re.IGNORECASE)
+
+# Anything bigger than this is a media segment, not a master playlist
+MAX_PLAYLIST_BYTES = 1_000_000
+
+# BANDWIDTH attribute of an #EXT-X-STREAM-INF tag (not AVERAGE-BANDWIDTH)
+BANDWIDTH_PATTERN = re.compile(r'[:,]BANDWIDTH=(\d+)')
+
+
+@lru_cache(maxsize=None)
+def find_chrome() -> str:
+    """Locate a Chrome/Chromium executable, honouring CHROME_PATH when set"""
+    configured = os.environ.get('CHROME_PATH')
+    if configured:
+        # An explicit override that doesn't work is an error, not a hint
+        if os.path.isfile(configured) and os.access(configured, os.X_OK):
+            return configured
+        raise FileNotFoundError(
+            f"CHROME_PATH is set to {configured!r}, which is not an executable file")
+
+    for name in CHROME_EXECUTABLES:
+        path = shutil.which(name)
+        if path:
+            return path
+
+    for path in CHROME_INSTALL_PATHS:
+        if os.path.isfile(path):
+            return path
+
+    raise FileNotFoundError("Chrome/Chromium executable not found")
+
+
+# Shared keep-alive connection pool for playlist fetches
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_SESSION.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+# Master playlists are a few hundred bytes, not worth decompressing
+_SESSION.headers['Accept-Encoding'] = 'identity'
+
+
+def devtools_request(port: int, path: str, method: str = 'GET') -> requests.Response:
+    """Call Chrome's DevTools HTTP endpoint (/json/...) on the given port"""
+    response = requests.request(
+        method, f'http://127.0.0.1:{port}/json/{path}', timeout=5)
+    response.raise_for_status()
+    return response
+
+
+# Best stream URL per master playlist. Players often retry the same master
+# playlist, and batches share them across pages
+_BEST_STREAM_URLS = {}
+
+
+def is_master_playlist(url: str) -> bool:
+    """Cheap checks that url is a master playlist worth fetching in full"""
+    if not url.startswith(('http://', 'https://')) or not url.endswith('playlist.m3u8'):
+        return False
+
+    # Already resolved once, so it's a playlist and no request is needed
+    if url in _BEST_STREAM_URLS:
+        return True
+
+    # A HEAD request weeds out multi-MB segments the broad M3U8 match can catch
+    try:
+        response = _SESSION.head(url, timeout=2, allow_redirects=True)
+    except requests.RequestException:
+        return True  # Let the real fetch report the problem
+
+    length = response.headers.get('Content-Length', '')
+    return not (length.isdigit() and int(length) > MAX_PLAYLIST_BYTES)
 
 
 def get_best_stream_url(master_url: str) -> str:
-    response = requests.get(master_url)
-    response.raise_for_status()  # Ensure we stop on HTTP errors
+    if master_url in _BEST_STREAM_URLS:
+        return _BEST_STREAM_URLS[master_url]
 
-    master_playlist = m3u8.loads(response.text)
+    response = _SESSION.get(master_url, timeout=10)
+    response.raise_for_status()  # Ensure we stop on HTTP errors
 
-    if not master_playlist.playlists:
+    # Find the variant with the highest bandwidth; its URI is the next non-tag line
+    best_bandwidth = -1
+    best_uri = None
+    pending_bandwidth = None
+
+    for line in response.text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            match = BANDWIDTH_PATTERN.search(line)
+            pending_bandwidth = int(match.group(1)) if match else 0
+        elif line and not line.startswith('#') and pending_bandwidth is not None:
+            if pending_bandwidth > best_bandwidth:
+                best_bandwidth = pending_bandwidth
+                best_uri = line
+            pending_bandwidth = None
+
+    if best_uri is None:
         raise ValueError("No stream variants found in the master playlist.")
 
-    # Find the playlist with the highest bandwidth
-    best_playlist = max(
-        master_playlist.playlists,
-        key=lambda p: p.stream_info.bandwidth if p.stream_info.bandwidth is not None else 0
-    )
-
     # Construct absolute URL if needed (relative URLs are common)
-    best_url = urljoin(master_url, best_playlist.uri)
+    best_url = urljoin(master_url, best_uri)
 
+    _BEST_STREAM_URLS[master_url] = best_url
     return best_url
 
 
+class CDPError(Exception):
+    """Raised when Chrome answers a DevTools command with an error"""
+
+
+# Everything that can go wrong while launching Chrome or attaching to it
+BROWSER_START_ERRORS = (
+    OSError, requests.RequestException, websocket.WebSocketException, CDPError)
+
+
+def report_browser_failure(error):
+    """Print the user-facing message for a browser that failed to start"""
+    print(f"❌ Failed to start browser: {error}")
+    print("💡 Make sure Google Chrome or Chromium is installed and on your PATH")
+
+
+class CDPSession:
+    def __init__(self, ws_url, timeout=30):
+        """
+        Connect to a DevTools target and start dispatching its messages
+
+        Args:
+            ws_url (str): webSocketDebuggerUrl of the target to drive
+            timeout (int): Maximum wait time in seconds for a command reply
+        """
+        self.timeout = timeout
+        # Chrome rejects DevTools websocket clients that send an Origin header
+        self.ws = websocket.create_connection(ws_url, suppress_origin=True)
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._listeners = {}
+        # Quoted method names, used to skip parsing frames nobody listens for
+        self._listener_keys = []
+        self._send_lock = threading.Lock()
+
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def on(self, method, callback):
+        """
+        Register a listener for a DevTools event
+
+        Args:
+            method (str): Event name, e.g. 'Network.responseReceived'
+            callback (callable): Called with the event params and the sessionId of
+                the attached child target that sent it (None for the page itself)
+        """
+        self._listeners.setdefault(method, []).append(callback)
+        self._listener_keys.append(b'"%s"' % method.encode())
+
+    def send(self, method, params=None, timeout=None, session_id=None):
+        """
+        Send a DevTools command and wait for its reply
+
+        Args:
+            method (str): Command name, e.g. 'Page.navigate'
+            params (dict): Command parameters
+            timeout (int): Override for the session reply timeout
+            session_id (str): Attached child target to send to, None for the page
+
+        Returns:
+            dict: The command result
+        """
+        msg_id = next(self._ids)
+        waiter = self._pending[msg_id] = [threading.Event(), None]
+        self._write(msg_id, method, params, session_id)
+
+        timeout = self.timeout if timeout is None else timeout
+        if not waiter[0].wait(timeout):
+            self._pending.pop(msg_id, None)
+            raise TimeoutError(f"{method} timed out after {timeout} seconds")
+
+        reply = waiter[1]
+        if 'error' in reply:
+            raise CDPError(f"{method}: {reply['error'].get('message')}")
+        return reply.get('result', {})
+
+    def post(self, method, params=None, session_id=None):
+        """Send a DevTools command without waiting, safe to call from listeners"""
+        self._write(next(self._ids), method, params, session_id)
+
+    def _write(self, msg_id, method, params, session_id=None):
+        """Serialize a command onto the websocket"""
+        message = {'id': msg_id, 'method': method, 'params': params or {}}
+        if session_id:
+            # Flattened child sessions share this socket, addressed by sessionId
+            message['sessionId'] = session_id
+        with self._send_lock:
+            self.ws.send(orjson.dumps(message))
+
+    def _read_loop(self):
+        """Route command replies to their waiters and events to listeners"""
+        loads = orjson.loads
+        listener_keys = self._listener_keys
+
+        while True:
+            try:
+                opcode, frame = self.ws.recv_data()
+            except (websocket.WebSocketException, OSError):
+                break
+            if opcode == websocket.ABNF.OPCODE_CLOSE:
+                break
+
+            # Chrome serializes replies as {"id":...}; events only matter if subscribed
+            if not frame.startswith(b'{"id"') and not any(
+                    key in frame for key in listener_keys):
+                continue
+
+            try:
+                message = loads(frame)
+            except orjson.JSONDecodeError:
+                continue
+
+            if 'id' in message:
+                waiter = self._pending.pop(message['id'], None)
+                if waiter:
+                    waiter[1] = message
+                    waiter[0].set()
+                continue
+
+            for callback in self._listeners.get(message.get('method'), ()):
+                try:
+                    callback(message.get('params', {}),
+                             message.get('sessionId'))
+                except Exception as e:
+                    print(f"⚠️ Error handling {message['method']}: {e}")
+
+        # Wake up anyone still waiting on a reply from a dead connection
+        for waiter in list(self._pending.values()):
+            waiter[1] = {'error': {'message': 'DevTools connection closed'}}
+            waiter[0].set()
+        self._pending.clear()
+
+    def close(self):
+        """Close the websocket, which also stops the reader thread"""
+        try:
+            self.ws.close()
+        except (websocket.WebSocketException, OSError):
+            pass
+
+
 class M3U8Grabber:
-    def __init__(self, headless=True, timeout=30):
+    def __init__(self, headless=True, timeout=30, port=None):
         """
         Initialize the M3U8 grabber with optimized browser settings
 
         Args:
             headless (bool): Run browser in headless mode
             timeout (int): Maximum wait time in seconds
+            port (int): Reuse (or start and keep running) a Chrome on this DevTools port
         """
         self.timeout = timeout
-        self.driver = None
-        self.m3u8_urls = []
-
-        # Set up Chrome options for maximum performance
-        self.chrome_options = Options()
+        self.persistent = port is not None
+        self.process = None
+        self.user_data_dir = None
+        self.target_id = None
+        self.port = port
+        self.cdp = None
+        self.user_agent = None
+        # url -> first response seen for it, in arrival order
+        self.m3u8_urls = {}
+        self._page_ready = threading.Event()
+        self._m3u8_found = threading.Event()
+        # (sessionId, requestId) pairs currently on the wire, for network-idle waits
+        self._inflight = set()
+        self._last_network_activity = time.monotonic()
+        self._network_changed = threading.Condition()
+
+        # Chrome command line tuned for maximum performance
+        self.chrome_args = []
 
         if headless:
-            self.chrome_options.add_argument('--headless')
+            self.chrome_args.append('--headless=new')
 
         # Performance optimizations
-        self.chrome_options.add_argument('--no-sandbox')
-        self.chrome_options.add_argument('--disable-dev-shm-usage')
-        self.chrome_options.add_argument('--disable-gpu')
-        self.chrome_options.add_argument('--disable-web-security')
-        self.chrome_options.add_argument(
-            '--disable-features=VizDisplayCompositor')
+        self.chrome_args.append('--no-sandbox')
+        self.chrome_args.append('--disable-dev-shm-usage')
+        self.chrome_args.append('--disable-gpu')
+        self.chrome_args.append('--disable-web-security')
+        self.chrome_args.append('--disable-features=VizDisplayCompositor')
+
+        # Skip subsystems the grabber never uses for faster startup and quieter traffic
+        self.chrome_args.extend([
+            '--disable-background-networking',
+            '--disable-default-apps',
+            '--disable-sync',
+            '--disable-translate',
+            '--disable-component-update',
+            '--no-first-run',
+            '--no-default-browser-check',
+            '--mute-audio',
+            '--disable-backgrounding-occluded-windows',
+            '--disable-renderer-backgrounding',
+            '--disable-ipc-flooding-protection',
+            '--disable-hang-monitor',
+            '--metrics-recording-only',
+        ])
 
         # Anti-detection measures for headless mode
         if headless:
-            self.chrome_options.add_argument(
+            self.chrome_args.append(
                 '--disable-blink-features=AutomationControlled')
-            self.chrome_options.add_experimental_option(
-                "excludeSwitches", ["enable-automation"])
-            self.chrome_options.add_experimental_option(
-                'useAutomationExtension', False)
             # Set a realistic window size
-            self.chrome_options.add_argument('--window-size=1920,1080')
+            self.chrome_args.append('--window-size=1920,1080')
             # Add user agent to look more like a real browser
-            self.chrome_options.add_argument(
-                '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+            self.user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
         # Block heavy resources to speed up loading
-        prefs = {
+        self.prefs = {
             "profile.managed_default_content_settings.images": 2,  # Block images
             "profile.managed_default_content_settings.plugins": 2,  # Block plugins
             "profile.managed_default_content_settings.popups": 2,  # Block popups
@@ -95,96 +393,375 @@ class M3U8Grabber:
             "profile.managed_default_content_settings.notifications": 2,  # Block notifications
             "profile.managed_default_content_settings.media_stream": 2,  # Block media
         }
-        self.chrome_options.add_experimental_option("prefs", prefs)
 
-        # Set up logging to capture network requests
-        self.chrome_options.add_argument('--enable-logging')
-        self.chrome_options.add_argument('--log-level=0')
+    def write_prefs(self):
+        """Write the content-setting prefs into the profile's Preferences file"""
+        preferences = {}
+        for dotted_key, value in self.prefs.items():
+            *parents, leaf = dotted_key.split('.')
+            node = preferences
+            for key in parents:
+                node = node.setdefault(key, {})
+            node[leaf] = value
+
+        profile_dir = os.path.join(self.user_data_dir, 'Default')
+        os.makedirs(profile_dir, exist_ok=True)
+        with open(os.path.join(profile_dir, 'Preferences'), 'w', encoding='utf-8') as f:
+            json.dump(preferences, f)
+
+    def read_devtools_port(self, process):
+        """Wait for Chrome to publish its DevTools port in DevToolsActivePort"""
+        port_file = os.path.join(self.user_data_dir, 'DevToolsActivePort')
+        deadline = time.monotonic() + self.timeout
+
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise OSError(
+                    f"Chrome exited early with code {process.returncode}")
+            try:
+                with open(port_file, encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+                # Second line (browser websocket path) means the file is fully written
+                if len(lines) >= 2:
+                    return int(lines[0])
+            except FileNotFoundError:
+                pass
+            time.sleep(0.1)
+
+        raise TimeoutError(
+            f"Chrome did not open a DevTools port within {self.timeout} seconds")
+
+    def launch_or_attach(self):
+        """Attach to a Chrome already serving self.port, otherwise launch one"""
+        if self.persistent:
+            try:
+                devtools_request(self.port, 'version')
+                print(f"♻️ Reusing running Chrome on port {self.port}")
+                return
+            except requests.RequestException:
+                print(f"🚀 Starting persistent Chrome on port {self.port}...")
+            self.user_data_dir = PERSISTENT_PROFILE_DIR
+        else:
+            print("🚀 Starting optimized Chrome browser...")
+            self.user_data_dir = tempfile.mkdtemp(prefix='m3u8grabber-')
 
-        # Enable performance logging for network monitoring
-        self.chrome_options.add_argument('--enable-logging')
-        self.chrome_options.add_argument('--log-level=0')
-        self.chrome_options.set_capability(
-            'goog:loggingPrefs', {'performance': 'ALL'})
+        self.write_prefs()
 
-    def start_driver(self):
-        """Initialize the Chrome WebDriver"""
+        # A previous persistent browser leaves its port file behind
         try:
-            print("🚀 Starting optimized Chrome browser...")
-
-            # Auto-install ChromeDriver if not found
-            try:
-                service = Service(ChromeDriverManager().install())
-                self.driver = webdriver.Chrome(
-                    service=service, options=self.chrome_options)
-            except Exception:
-                # Fallback to system ChromeDriver
-                print("📦 Using system ChromeDriver...")
-                self.driver = webdriver.Chrome(options=self.chrome_options)
-
-            # Anti-detection measures
-            self.driver.execute_script(
-                "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-
-            # Enable network monitoring
-            self.driver.execute_cdp_cmd('Network.enable', {})
+            os.remove(os.path.join(self.user_data_dir, 'DevToolsActivePort'))
+        except FileNotFoundError:
+            pass
+
+        process = subprocess.Popen(
+            [find_chrome(), *self.chrome_args,
+             f'--remote-debugging-port={self.port or 0}',
+             f'--user-data-dir={self.user_data_dir}'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            # Persistent browsers must outlive this process and its signals
+            start_new_session=self.persistent,
+        )
+        self.port = self.read_devtools_port(process)
+
+        if not self.persistent:
+            self.process = process
+
+    def start_browser(self):
+        """Get a browser and attach a DevTools session to a fresh tab"""
+        try:
+            self.launch_or_attach()
+
+            target = devtools_request(
+                self.port, 'new?about:blank', method='PUT').json()
+            self.target_id = target['id']
+            self.cdp = CDPSession(
+                target['webSocketDebuggerUrl'], timeout=self.timeout)
+
+            self.cdp.on('Network.responseReceived',
+                        self.on_response_received)
+            self.cdp.on('Fetch.requestPaused', self.on_request_paused)
+            self.cdp.on('Network.requestWillBeSent', self.on_request_started)
+            self.cdp.on('Network.loadingFinished', self.on_request_settled)
+            self.cdp.on('Network.loadingFailed', self.on_request_settled)
+            # DOMContentLoaded or load, whichever comes first, means the page is usable
+            self.cdp.on('Page.domContentEventFired', self.on_page_ready)
+            self.cdp.on('Page.loadEventFired', self.on_page_ready)
+            self.cdp.on('Target.attachedToTarget', self.on_target_attached)
+            self.cdp.on('Target.detachedFromTarget', self.on_target_detached)
+
+            # Enable page lifecycle monitoring
+            self.cdp.send('Page.enable')
+
+            # Network monitoring, blocking and auto-attach to out-of-process iframes
+            for method, params in self.session_commands():
+                self.cdp.send(method, params)
             print("✅ Browser started successfully")
             return True
 
-        except WebDriverException as e:
-            print(f"❌ Failed to start browser: {e}")
-            print("💡 Installing ChromeDriver automatically...")
-            print("💡 If this fails, install manually: pip install webdriver-manager")
+        except BROWSER_START_ERRORS as e:
+            report_browser_failure(e)
+            self.cleanup()
             return False
 
-    def extract_m3u8_from_logs(self):
-        """Extract M3U8 URLs from browser performance logs"""
-        print("🔍 Analyzing network requests for M3U8 URLs...")
+    def session_commands(self):
+        """
+        DevTools commands that set up network monitoring on a target
 
-        try:
-            logs = self.driver.get_log('performance')
-            m3u8_found = []
+        Sent to the page and to every child target (cross-origin iframes,
+        workers) it auto-attaches, since those run in their own processes
+        and don't inherit the page's Network/Fetch settings.
 
-            for entry in logs:
-                try:
-                    message = json.loads(entry['message'])
-
-                    # Look for network response events
-                    if message['message']['method'] == 'Network.responseReceived':
-                        response = message['message']['params']['response']
-                        url = response.get('url', '')
-                        mime_type = response.get('mimeType', '')
-
-                        # Check if it's an M3U8 file
-                        if (url.endswith('.m3u8') or
-                            'application/vnd.apple.mpegurl' in mime_type or
-                            'application/x-mpegURL' in mime_type or
-                                'm3u8' in url.lower()):
-
-                            print(f"🎯 Found M3U8: {url}")
-                            m3u8_found.append({
-                                'url': url,
-                                'mime_type': mime_type,
-                                'timestamp': entry['timestamp']
-                            })
-
-                except (json.JSONDecodeError, KeyError):
+        Returns:
+            list: (method, params) pairs, in the order to send them
+        """
+        commands = [
+            ('Network.enable', {}),
+            # Drop heavy and tracking resources before they hit the network
+            ('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS}),
+            ('Fetch.enable', {'patterns': [
+                {'urlPattern': '*', 'resourceType': resource_type,
+                    'requestStage': 'Request'}
+                for resource_type in BLOCKED_RESOURCE_TYPES
+            ]}),
+            ('Network.setCacheDisabled', {'cacheDisabled': False}),
+        ]
+        if self.user_agent:
+            commands.append(('Network.setUserAgentOverride',
+                             {'userAgent': self.user_agent}))
+        commands.append(('Target.setAutoAttach', {
+            'autoAttach': True,
+            'waitForDebuggerOnStart': False,
+            'flatten': True,
+        }))
+        return commands
+
+    def evaluate(self, expression, await_promise=False, timeout=None):
+        """
+        Run JavaScript in the page and return its value
+
+        Args:
+            expression (str): JavaScript expression to evaluate
+            await_promise (bool): Wait for the returned promise to settle
+            timeout (int): Override for the DevTools reply timeout
+
+        Returns:
+            The JSON-serializable result of the expression
+        """
+        result = self.cdp.send('Runtime.evaluate', {
+            'expression': expression,
+            'returnByValue': True,
+            'awaitPromise': await_promise,
+            'userGesture': True,
+        }, timeout=timeout)
+
+        if 'exceptionDetails' in result:
+            details = result['exceptionDetails']
+            raise CDPError(details.get('exception', {}).get(
+                'description', details.get('text')))
+        return result.get('result', {}).get('value')
+
+    def navigate(self, url):
+        """Navigate the tab to url and block until its DOM is ready"""
+        self._page_ready.clear()
+        result = self.cdp.send('Page.navigate', {'url': url})
+        if result.get('errorText'):
+            raise CDPError(f"Navigation failed: {result['errorText']}")
+
+        if not self._page_ready.wait(self.timeout):
+            raise TimeoutError(f"Page load timed out after {self.timeout} seconds")
+
+    def wait_for_condition(self, condition, timeout):
+        """
+        Poll a JavaScript condition inside the page in a single round trip
+
+        Args:
+            condition (str): JavaScript expression that becomes truthy when done
+            timeout (int): Maximum wait time in seconds
+
+        Returns:
+            The condition's first truthy value, or None on timeout
+        """
+        return self.evaluate("""
+            new Promise(resolve => {
+                const deadline = Date.now() + %d;
+                (function check() {
+                    const value = (%s);
+                    if (value) return resolve(value);
+                    if (Date.now() > deadline) return resolve(null);
+                    setTimeout(check, 100);
+                })();
+            })""" % (timeout * 1000, condition),
+            await_promise=True, timeout=timeout + 5)
+
+    def wait_for_playback(self, timeout):
+        """Wait until the page's video element is playing, returns None on timeout"""
+        return self.wait_for_condition(
+            "(v => v && !v.paused)(document.querySelector('video'))", timeout)
+
+    def wait_network_idle(self, timeout, idle_time=0.5):
+        """
+        Block until no request has been in flight for idle_time seconds,
+        counting only quiet time after the wait started
+
+        Args:
+            timeout (float): Maximum wait time in seconds
+            idle_time (float): How long the network must stay quiet
+
+        Returns:
+            bool: True if the network went idle before the timeout
+        """
+        start = time.monotonic()
+        deadline = start + timeout
+        with self._network_changed:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    return False
+                if self._inflight:
+                    self._network_changed.wait(deadline - now)
                     continue
+                # Quiet time before the call doesn't count: the action that
+                # preceded it may not have produced its requests yet
+                quiet_for = now - max(self._last_network_activity, start)
+                if quiet_for >= idle_time:
+                    return True
+                self._network_changed.wait(
+                    min(idle_time - quiet_for, deadline - now))
+
+    def click_first_visible(self, selectors):
+        """
+        JavaScript-click the first displayed element matching any of the selectors
 
-            # Remove duplicates and sort by timestamp
-            unique_m3u8 = []
-            seen_urls = set()
+        Args:
+            selectors (list): CSS selectors, tried in order within a single round trip
 
-            for item in sorted(m3u8_found, key=lambda x: x['timestamp']):
-                if item['url'] not in seen_urls:
-                    unique_m3u8.append(item)
-                    seen_urls.add(item['url'])
+        Returns:
+            str: The selector that matched, or None
+        """
+        return self.evaluate("""
+            (function(sels) {
+                for (const sel of sels) {
+                    let els;
+                    try { els = document.querySelectorAll(sel); } catch (e) { continue; }
+                    for (const el of els) {
+                        if (el.offsetParent !== null) {
+                            el.click();
+                            return sel;
+                        }
+                    }
+                }
+                return null;
+            })(%s)""" % json.dumps(selectors))
 
-            return unique_m3u8
+    def locate_first_visible(self, selectors):
+        """
+        Scroll the first displayed element matching any selector into view
 
-        except Exception as e:
-            print(f"⚠️ Error analyzing logs: {e}")
-            return []
+        Args:
+            selectors (list): CSS selectors, tried in order within a single round trip
+
+        Returns:
+            dict: The matched selector, the element's centre point and whether
+                another element (an ad or consent overlay) covers that point, or None
+        """
+        return self.evaluate("""
+            (function(sels) {
+                for (const sel of sels) {
+                    let els;
+                    try { els = document.querySelectorAll(sel); } catch (e) { continue; }
+                    for (const el of els) {
+                        if (el.offsetParent !== null) {
+                            el.scrollIntoView({block: 'center'});
+                            const r = el.getBoundingClientRect();
+                            const x = r.left + r.width / 2, y = r.top + r.height / 2;
+                            const hit = document.elementFromPoint(x, y);
+                            const covered = !hit || !(hit === el || el.contains(hit));
+                            return {selector: sel, x: x, y: y, covered: covered};
+                        }
+                    }
+                }
+                return null;
+            })(%s)""" % json.dumps(selectors))
+
+    def mouse_click(self, x, y):
+        """Dispatch a real left mouse click at viewport coordinates"""
+        for event_type in ('mousePressed', 'mouseReleased'):
+            self.cdp.send('Input.dispatchMouseEvent', {
+                'type': event_type,
+                'x': x,
+                'y': y,
+                'button': 'left',
+                'clickCount': 1,
+            })
+
+    def on_page_ready(self, params, session_id):
+        """Page.domContentEventFired/loadEventFired listener for the top-level page"""
+        if session_id is None:
+            self._page_ready.set()
+
+    def on_target_attached(self, params, session_id):
+        """Target.attachedToTarget listener that sets up each child target"""
+        # Runs on the reader thread, so replies can't be awaited here
+        for method, command_params in self.session_commands():
+            self.cdp.post(method, command_params,
+                          session_id=params['sessionId'])
+
+    def on_target_detached(self, params, session_id):
+        """Target.detachedFromTarget listener that forgets a child's requests"""
+        child = params.get('sessionId')
+        with self._network_changed:
+            self._inflight = {
+                key for key in self._inflight if key[0] != child}
+            self._network_changed.notify_all()
+
+    def on_request_started(self, params, session_id):
+        """Network.requestWillBeSent listener that tracks in-flight requests"""
+        with self._network_changed:
+            self._inflight.add((session_id, params.get('requestId')))
+            self._last_network_activity = time.monotonic()
+            self._network_changed.notify_all()
+
+    def on_request_settled(self, params, session_id):
+        """Network.loadingFinished/loadingFailed listener that tracks in-flight requests"""
+        with self._network_changed:
+            self._inflight.discard((session_id, params.get('requestId')))
+            self._last_network_activity = time.monotonic()
+            self._network_changed.notify_all()
+
+    def on_request_paused(self, params, session_id):
+        """Fetch.requestPaused listener that aborts intercepted heavy resources"""
+        self.cdp.post('Fetch.failRequest', {
+            'requestId': params['requestId'],
+            'errorReason': 'BlockedByClient',
+        }, session_id=session_id)
+
+    def on_response_received(self, params, session_id):
+        """Network.responseReceived listener that records M3U8 responses"""
+        response = params.get('response', {})
+        url = response.get('url', '')
+        mime_type = response.get('mimeType', '')
+
+        if url in self.m3u8_urls:
+            return
+
+        # Check if it's an M3U8 file
+        if M3U8_PATTERN.search(url) or M3U8_PATTERN.search(mime_type):
+
+            print(f"🎯 Found M3U8: {url}")
+            self.m3u8_urls[url] = {
+                'url': url,
+                'mime_type': mime_type,
+                'timestamp': params.get('timestamp', 0)
+            }
+            self._m3u8_found.set()
+
+    def extract_m3u8_urls(self):
+        """Return the M3U8 responses captured so far"""
+        print("🔍 Analyzing network requests for M3U8 URLs...")
+
+        # Responses are deduplicated as they arrive, already in chronological order
+        return list(self.m3u8_urls.values())
 
     def wait_for_video_player(self):
         """Wait for video player elements to appear"""
@@ -202,15 +779,16 @@ class M3U8Grabber:
             '.plyr',
         ]
 
-        for selector in video_selectors:
-            try:
-                WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                )
+        # One 5s wait for all selectors, reporting the first one in the list that matches
+        try:
+            selector = self.wait_for_condition(
+                '(sels => sels.find(s => document.querySelector(s)))(%s)'
+                % json.dumps(video_selectors), 5)
+            if selector:
                 print(f"✅ Found video element: {selector}")
                 return True
-            except TimeoutException:
-                continue
+        except (CDPError, TimeoutError):
+            pass
 
         print("⚠️ No video player found, continuing anyway...")
         return False
@@ -220,13 +798,13 @@ class M3U8Grabber:
         print("🖱️ Simulating user interactions...")
 
         try:
-            # Wait a bit for page to settle
-            time.sleep(3)
+            # Wait for the page to settle
+            self.wait_network_idle(3)
 
             # Scroll down to trigger lazy loading
-            self.driver.execute_script(
+            self.evaluate(
                 "window.scrollTo(0, document.body.scrollHeight/3);")
-            time.sleep(2)
+            self.wait_network_idle(2)
 
             # Look for common video containers and click them
             video_containers = [
@@ -240,20 +818,10 @@ class M3U8Grabber:
                 '.plyr',
             ]
 
-            for selector in video_containers:
-                try:
-                    elements = self.driver.find_elements(
-                        By.CSS_SELECTOR, selector)
-                    for element in elements:
-                        if element.is_displayed():
-                            print(f"🎬 Clicking video container: {selector}")
-                            # Use JavaScript click to avoid interception
-                            self.driver.execute_script(
-                                "arguments[0].click();", element)
-                            time.sleep(2)
-                            break
-                except:
-                    continue
+            selector = self.click_first_visible(video_containers)
+            if selector:
+                print(f"🎬 Clicking video container: {selector}")
+                self.wait_network_idle(2)
 
             # Try to find and click play button with more selectors
             play_selectors = [
@@ -271,29 +839,22 @@ class M3U8Grabber:
                 '.jwplayer-display-icon-container',
             ]
 
-            for selector in play_selectors:
-                try:
-                    play_buttons = self.driver.find_elements(
-                        By.CSS_SELECTOR, selector)
-                    for play_button in play_buttons:
-                        if play_button.is_displayed():
-                            print(f"▶️  Clicking play button: {selector}")
-                            # Try both regular and JavaScript click
-                            try:
-                                play_button.click()
-                            except:
-                                self.driver.execute_script(
-                                    "arguments[0].click();", play_button)
-                            time.sleep(3)
-                            break
-                except:
-                    continue
+            point = self.locate_first_visible(play_selectors)
+            if point:
+                print(f"▶️  Clicking play button: {point['selector']}")
+                # A real mouse click would land on whatever covers the button,
+                # so fall back to a JavaScript click on the button itself
+                if point['covered']:
+                    self.click_first_visible([point['selector']])
+                else:
+                    self.mouse_click(point['x'], point['y'])
+                self.wait_for_playback(3)
 
             # Additional interactions to trigger video loading
             print("🔄 Performing additional interactions...")
 
             # Simulate mouse movement over video area
-            self.driver.execute_script("""
+            self.evaluate("""
                 var event = new MouseEvent('mouseover', {
                     view: window,
                     bubbles: true,
@@ -301,19 +862,19 @@ class M3U8Grabber:
                 });
                 document.body.dispatchEvent(event);
             """)
-            time.sleep(1)
+            self.wait_network_idle(1)
 
             # Simulate focus events
-            self.driver.execute_script("window.focus();")
-            time.sleep(1)
+            self.evaluate("window.focus();")
+            self.wait_network_idle(1)
 
             # Scroll back to top
-            self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(2)
+            self.evaluate("window.scrollTo(0, 0);")
+            self.wait_network_idle(2)
 
             # Try clicking on the page body to ensure focus
-            self.driver.execute_script("document.body.click();")
-            time.sleep(2)
+            self.evaluate("document.body.click();")
+            self.wait_network_idle(2)
 
         except Exception as e:
             print(f"⚠️ Error during interaction: {e}")
@@ -328,19 +889,14 @@ class M3U8Grabber:
         Returns:
             list: List of found M3U8 URLs
         """
-        if not self.start_driver():
+        if not self.start_browser():
             return []
 
         try:
             print(f"🌐 Navigating to: {url}")
 
-            # Navigate to the page
-            self.driver.get(url)
-
-            # Wait for initial page load
-            WebDriverWait(self.driver, self.timeout).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            # Navigate to the page and wait for its DOM to be ready
+            self.navigate(url)
             print("✅ Page loaded successfully")
 
             # Wait for video player
@@ -352,33 +908,30 @@ class M3U8Grabber:
             # Wait a bit more for network requests and try multiple times
             print("⏳ Waiting for M3U8 requests...")
 
-            # Check for M3U8 URLs multiple times with delays
+            # Wait for the network listener to see an M3U8, interacting more between attempts
             m3u8_urls = []
             max_attempts = 3
 
             for attempt in range(max_attempts):
                 print(
-                    f"🔍 Attempt {attempt + 1}/{max_attempts} - Analyzing network requests...")
-                time.sleep(5)  # Wait longer between attempts
+                    f"🔍 Attempt {attempt + 1}/{max_attempts} - Waiting for M3U8 requests...")
 
-                # Extract M3U8 URLs from logs
-                found_urls = self.extract_m3u8_from_logs()
-
-                if found_urls:
-                    m3u8_urls = found_urls
+                # Returns as soon as a matching response arrives
+                if self._m3u8_found.wait(timeout=self.timeout / max_attempts):
+                    m3u8_urls = self.extract_m3u8_urls()
                     break
 
                 if attempt < max_attempts - 1:  # Don't interact on last attempt
                     print("🔄 No M3U8 found yet, trying more interactions...")
                     # Try additional interactions
-                    self.driver.execute_script(
+                    self.evaluate(
                         "window.scrollTo(0, document.body.scrollHeight);")
-                    time.sleep(2)
-                    self.driver.execute_script("window.scrollTo(0, 0);")
-                    time.sleep(1)
+                    self.wait_network_idle(2)
+                    self.evaluate("window.scrollTo(0, 0);")
+                    self.wait_network_idle(1)
 
                     # Try clicking anywhere on the page
-                    self.driver.execute_script("""
+                    self.evaluate("""
                         var elements = document.querySelectorAll('div, span, button, a');
                         for(var i = 0; i < Math.min(5, elements.length); i++) {
                             if(elements[i].offsetParent !== null) {
@@ -387,7 +940,7 @@ class M3U8Grabber:
                             }
                         }
                     """)
-                    time.sleep(2)
+                    self.wait_network_idle(2)
 
             if m3u8_urls:
                 print(f"🎉 Successfully found {len(m3u8_urls)} M3U8 URL(s)!")
@@ -398,7 +951,7 @@ class M3U8Grabber:
 
             return m3u8_urls
 
-        except TimeoutException:
+        except TimeoutError:
             print(f"⏰ Timeout after {self.timeout} seconds")
             return []
 
@@ -411,67 +964,197 @@ class M3U8Grabber:
 
     def cleanup(self):
         """Clean up resources"""
-        if self.driver:
+        if self.cdp:
+            self.cdp.close()
+            self.cdp = None
+
+        # A persistent browser stays up, only the tab used by this run is closed
+        if self.persistent and self.target_id:
+            try:
+                devtools_request(self.port, f'close/{self.target_id}')
+            except requests.RequestException:
+                pass
+            self.target_id = None
+
+        if self.process:
             print("🧹 Closing browser...")
-            self.driver.quit()
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+            self.process = None
             print("✅ Browser closed")
 
+        if self.user_data_dir and not self.persistent:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
+
+
+def grabber_port():
+    """DevTools port of a reusable browser, taken from M3U8_GRABBER_PORT"""
+    port = os.environ.get('M3U8_GRABBER_PORT')
+    return int(port) if port else None
+
+
+def _grab_one(url):
+    """Grab the M3U8 URLs of one page with its own grabber"""
+    grabber = M3U8Grabber(headless=True, timeout=30, port=grabber_port())
+    return url, grabber.grab_m3u8_url(url)
+
+
+def _init_worker():
+    """Pool initializer: turn SIGTERM into SystemExit so cleanup() still runs"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+
+
+def _pool_grab(url):
+    """Pool worker: like _grab_one, but always hands a result back to the pool"""
+    grabber = M3U8Grabber(headless=True, timeout=30, port=grabber_port())
+    try:
+        return url, grabber.grab_m3u8_url(url)
+    except KeyboardInterrupt:
+        # Ctrl-C reaches the whole process group; a worker that dies without a
+        # result would leave the pool waiting for it forever
+        grabber.cleanup()
+        return url, []
+
+
+def grab_all(target_urls):
+    """
+    Grab M3U8 URLs for every page, one browser per worker process for batches
+
+    Args:
+        target_urls (list): Website URLs to visit
+
+    Yields:
+        tuple: (page URL, list of found M3U8 URLs), in completion order
+    """
+    if len(target_urls) == 1:
+        yield _grab_one(target_urls[0])
+        return
+
+    port = grabber_port()
+    if port:
+        # Start the shared browser once so workers don't race to launch it
+        try:
+            M3U8Grabber(headless=True, timeout=30,
+                        port=port).launch_or_attach()
+        except BROWSER_START_ERRORS as e:
+            report_browser_failure(e)
+            sys.exit(1)
+
+    workers = min(multiprocessing.cpu_count(), 4, len(target_urls))
+    pool = multiprocessing.Pool(processes=workers, initializer=_init_worker)
+    completed = False
+    try:
+        yield from pool.imap_unordered(_pool_grab, target_urls)
+        completed = True
+    finally:
+        if completed:
+            pool.close()
+        else:
+            # Interrupted or abandoned: don't start the remaining pages. Workers
+            # exit through SystemExit on SIGTERM, so their browsers are cleaned up
+            pool.terminate()
+        pool.join()
+
 
 def main():
     """Main function"""
-    if len(sys.argv) > 1:
-        target_url = sys.argv[1]
-        text_file = sys.argv[2]
+    parser = argparse.ArgumentParser(
+        description="M3U8 Link Grabber",
+        epilog="Set M3U8_GRABBER_PORT to a DevTools port to reuse one warm Chrome "
+               "across runs: it is attached to if already running, otherwise "
+               "started on that port and left running. Set CHROME_PATH to pick "
+               "the Chrome executable.")
+    parser.add_argument('url', nargs='?', help="Website URL to visit")
+    parser.add_argument(
+        'text_file', help="File the best stream URLs are appended to")
+    parser.add_argument(
+        '--urls-file',
+        help="File with one website URL per line, grabbed in parallel "
+             "(workers share the browser on M3U8_GRABBER_PORT when it is set)")
+    args = parser.parse_args()
+
+    port = os.environ.get('M3U8_GRABBER_PORT')
+    if port and not (port.isdigit() and 0 < int(port) < 65536):
+        parser.error(
+            f"M3U8_GRABBER_PORT must be a TCP port number, got {port!r}")
+
+    if args.urls_file:
+        with open(args.urls_file, encoding='utf-8') as f:
+            target_urls = [line.strip() for line in f if line.strip()]
+    elif args.url:
+        target_urls = [args.url]
     else:
+        parser.error("either a URL or --urls-file is required")
+
+    if not target_urls:
         sys.exit(1)
+    text_file = args.text_file
 
     print("🎯 M3U8 Link Grabber")
     print("=" * 50)
-    print(f"Target URL: {target_url}")
+    for target_url in target_urls:
+        print(f"Target URL: {target_url}")
     print("=" * 50)
 
-    # Create grabber instance
-    grabber = M3U8Grabber(headless=True, timeout=30)
+    found_any = False
 
-    # Grab M3U8 URLs
-    m3u8_urls = grabber.grab_m3u8_url(target_url)
+    # Results are written here in the parent only, so appends never interleave
+    for target_url, m3u8_urls in grab_all(target_urls):
+        # Output results
+        print("\n" + "=" * 50)
+        print(f"📋 RESULTS: {target_url}")
 
-    # Output results
-    print("\n" + "=" * 50)
-    print("📋 RESULTS:")
+        if not m3u8_urls:
+            print("❌ No M3U8 URLs found")
+            continue
+
+        found_any = True
 
-    if m3u8_urls:
         print(f"✅ Found {len(m3u8_urls)} M3U8 URL(s):")
 
         for i, item in enumerate(m3u8_urls, 1):
             print(f"\n{i}. URL: {item['url']}")
             print(f"   MIME Type: {item.get('mime_type', 'N/A')}")
 
-        # Save to file
+        # Filter before resolving anything, so stray segments are never downloaded
+        candidates = []
         for item in m3u8_urls:
-            if not item['url'].endswith('playlist.m3u8'):
+            if is_master_playlist(item['url']):
+                candidates.append(item)
+            else:
                 print(f"⚠️ Skipping non-M3U8 URL: {item['url']}")
-                continue
-            url = get_best_stream_url(item['url'])
-            with open(text_file, 'a', encoding='utf-8') as f:
-                f.write(f"{url}\n")
-                print(f"✅ Saved to {text_file}")
 
-        # Show command for Go downloader
-        if m3u8_urls:
-            best_url = m3u8_urls[0]['url']  # Use first/best URL
-            print(f"\n🚀 Ready for Go downloader:")
-            print(f"go run main.go \"{best_url}\"")
-            sys.exit(0)
+        # Save to file in a single append, keeping whatever resolved if one lookup fails
+        lines = []
+        for item in candidates:
+            try:
+                lines.append(f"{get_best_stream_url(item['url'])}\n")
+            except (requests.RequestException, ValueError) as e:
+                print(f"⚠️ Could not resolve {item['url']}: {e}")
 
-    else:
-        print("❌ No M3U8 URLs found")
-        print("\n💡 Troubleshooting tips:")
-        print("  1. Check if the website is accessible")
-        print("  2. The video might require additional user interaction")
-        print("  3. Try running with headless=False to see what's happening")
-        print("  4. The website might be using a different video player")
-        sys.exit(1)
+        if lines:
+            with open(text_file, 'a', encoding='utf-8', buffering=1 << 16) as f:
+                f.writelines(lines)
+            print(f"✅ Saved {len(lines)} URL(s) to {text_file}")
+
+        # Show command for Go downloader
+        best_url = m3u8_urls[0]['url']  # Use first/best URL
+        print(f"\n🚀 Ready for Go downloader:")
+        print(f"go run main.go \"{best_url}\"")
+
+    if found_any:
+        sys.exit(0)
+
+    print("\n💡 Troubleshooting tips:")
+    print("  1. Check if the website is accessible")
+    print("  2. The video might require additional user interaction")
+    print("  3. Try running with headless=False to see what's happening")
+    print("  4. The website might be using a different video player")
+    sys.exit(1)
 
 
 if __name__ == "__main__":